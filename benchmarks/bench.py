@@ -0,0 +1,303 @@
+"""
+Times every MEOW tool against locally generated fixtures.
+
+    python -m benchmarks.bench --output results.json
+    python -m benchmarks.bench --baseline results.json   # compare, exit 1 on regressions
+
+Benchmarks whose dependencies (ffmpeg, pydub, mido, python-osc) are missing
+are recorded as "skipped" rather than failing the run.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+
+from benchmarks import fixtures
+
+BENCHMARKS = {}
+
+
+def benchmark(name, needs=()):
+    """
+    Registers a benchmark. The decorated function does its setup and
+    returns a zero-argument callable; only that callable is timed.
+    """
+    def register(func):
+        BENCHMARKS[name] = (func, needs)
+        return func
+    return register
+
+
+def _missing(needs):
+    missing = []
+    for need in needs:
+        if need == "ffmpeg":
+            if shutil.which("ffmpeg") is None:
+                missing.append("ffmpeg")
+            continue
+        try:
+            __import__(need)
+        except ImportError:
+            missing.append(need)
+    return missing
+
+
+# ---------- Video ----------
+
+@benchmark("compile_video/320x180x48", needs=("ffmpeg",))
+def bench_compile_video_small(workdir):
+    from programs.ffmpeg_local import compile_video
+    directory = fixtures.png_sequence(os.path.join(workdir, "png_small"), 48, 320, 180)
+    return lambda: compile_video(directory, reveal=False)
+
+
+@benchmark("compile_video/1280x720x24", needs=("ffmpeg",))
+def bench_compile_video_large(workdir):
+    from programs.ffmpeg_local import compile_video
+    directory = fixtures.png_sequence(os.path.join(workdir, "png_large"), 24, 1280, 720)
+    return lambda: compile_video(directory, reveal=False)
+
+
+@benchmark("png_to_gif/320x180x48", needs=("ffmpeg",))
+def bench_png_to_gif(workdir):
+    from programs.png_to_gif import png_to_gif
+    directory = fixtures.png_sequence(os.path.join(workdir, "png_gif"), 48, 320, 180, prefix="")
+    return lambda: png_to_gif(directory)
+
+
+@benchmark("slice_video/3x4s", needs=("ffmpeg",))
+def bench_slice_video(workdir):
+    from programs.fuckitup_video import slice_video
+    directory = os.path.join(workdir, "videos")
+    os.makedirs(directory, exist_ok=True)
+    for i in range(3):
+        fixtures.sample_video(os.path.join(directory, f"clip{i}.mp4"), 4)
+    # slice_video writes output_<name> into the working directory (workdir)
+    return lambda: slice_video(directory, 128, "sliced.mp4")
+
+
+# ---------- Audio ----------
+
+def _wav_library(workdir, name):
+    directory = os.path.join(workdir, name)
+    os.makedirs(directory, exist_ok=True)
+    fixtures.sine_wav(os.path.join(directory, "sine.wav"), 20)
+    fixtures.noise_wav(os.path.join(directory, "noise.wav"), 20)
+    return directory
+
+
+@benchmark("slice_audio/2x20s", needs=("pydub", "ffmpeg"))
+def bench_slice_audio(workdir):
+    from programs.fuckitup import slice_audio
+    directory = _wav_library(workdir, "wav_slice")
+    return lambda: slice_audio(directory, 128, os.path.join(workdir, "sliced.mp3"))
+
+
+@benchmark("change_pitch/2x20s", needs=("pydub", "ffmpeg"))
+def bench_change_pitch(workdir):
+    from programs.shift_pitch import change_pitch
+    directory = _wav_library(workdir, "wav_pitch")
+    return lambda: change_pitch(directory, -5)
+
+
+@benchmark("analyze_file/60s")
+def bench_analyze_file(workdir):
+    from programs.tempo import analyze_file
+    path = fixtures.noise_wav(os.path.join(workdir, "tempo.wav"), 60)
+    return lambda: analyze_file(path)
+
+
+# ---------- MIDI ----------
+
+@benchmark("midi_to_csv/4x2000", needs=("mido",))
+def bench_midi_to_csv(workdir):
+    from programs.midi_to_csv import convert_midi_to_csv
+    path = fixtures.midi_file(os.path.join(workdir, "csv.mid"))
+    return lambda: convert_midi_to_csv(path)
+
+
+@benchmark("midi_to_osc/4x2000", needs=("mido", "pythonosc"))
+def bench_midi_to_osc(workdir):
+    from programs.midi_to_osc import convert_midi_to_osc
+    path = fixtures.midi_file(os.path.join(workdir, "osc.mid"))
+    return lambda: convert_midi_to_osc(path)
+
+
+# ---------- Beat grid ----------
+
+@benchmark("fpsbpmlooper/60fps-90bpm")
+def bench_fpsbpmlooper(workdir):
+    from programs.FPS_BPM_Calc import fpsbpmlooper
+    return lambda: fpsbpmlooper(fps=60, bpm=90, interactive=False)
+
+
+# ---------- Record calculator ----------
+
+@benchmark("compute_release_pnl/x1000")
+def bench_release_pnl(workdir):
+    from programs.meow_record_calc import Manufacturing, ReleaseCosts, SalesPlan, ShopifyFees, compute_release_pnl
+    args = (Manufacturing(), ReleaseCosts(), SalesPlan(), ShopifyFees())
+
+    def run():
+        for _ in range(1000):
+            compute_release_pnl(*args)
+    return run
+
+
+@benchmark("compute_release_pnl_grid/1M")
+def bench_release_pnl_grid(workdir):
+    import numpy as np
+    from programs.meow_record_calc import Manufacturing, ReleaseCosts, SalesPlan, ShopifyFees, compute_release_pnl_grid
+    args = (Manufacturing(), ReleaseCosts(), SalesPlan(), ShopifyFees())
+    return lambda: compute_release_pnl_grid(
+        *args,
+        unit_price=np.linspace(15, 60, 100), units=np.arange(100, 2100, 20),
+        sell_through=np.linspace(0.1, 1, 10), marketing=np.linspace(0, 20000, 10),
+    )
+
+
+@benchmark("build_cashflow_timeline/x100")
+def bench_cashflow_timeline(workdir):
+    from programs.meow_record_calc import (
+        CashFlowSchedule, Manufacturing, ReleaseCosts, SalesPlan, ShopifyFees, build_cashflow_timeline,
+    )
+    args = (Manufacturing(), ReleaseCosts(), SalesPlan(months_to_sell=24), ShopifyFees(), CashFlowSchedule(date(2026, 1, 1)))
+
+    def run():
+        for _ in range(100):
+            build_cashflow_timeline(*args)
+    return run
+
+
+@benchmark("build_portfolio_cashflow/500")
+def bench_portfolio_cashflow(workdir):
+    from programs.meow_record_calc import (
+        CashFlowSchedule, Manufacturing, PortfolioRelease, ReleaseCosts, SalesPlan, ShopifyFees,
+        add_months, build_portfolio_cashflow,
+    )
+    releases = [
+        PortfolioRelease(f"release {i}", Manufacturing(300 + i), ReleaseCosts(), SalesPlan(months_to_sell=12),
+                         CashFlowSchedule(add_months(date(2026, 1, 1), i % 36)))
+        for i in range(500)
+    ]
+    return lambda: build_portfolio_cashflow(releases, ShopifyFees())
+
+
+# ---------- Runner ----------
+
+def run_benchmarks(repeat=3, only=None):
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="meow-bench-") as workdir:
+        cwd = os.getcwd()
+        os.chdir(workdir)
+        try:
+            for name, (setup, needs) in BENCHMARKS.items():
+                if only and not any(pattern in name for pattern in only):
+                    continue
+                missing = _missing(needs)
+                if missing:
+                    results[name] = {"status": "skipped", "reason": "missing " + ", ".join(missing)}
+                    print(f"{name:<36} skipped (missing {', '.join(missing)})", file=sys.stderr)
+                    continue
+                try:
+                    # the tools print as they go; keep the benchmark output readable
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        run = setup(workdir)
+                        timings = []
+                        for _ in range(repeat):
+                            started = time.perf_counter()
+                            run()
+                            timings.append(time.perf_counter() - started)
+                except Exception as e:
+                    results[name] = {"status": "error", "error": f"{type(e).__name__}: {e}"}
+                    print(f"{name:<36} error ({type(e).__name__}: {e})", file=sys.stderr)
+                    continue
+                results[name] = {
+                    "status": "ok",
+                    "runs": timings,
+                    "min": min(timings),
+                    "median": statistics.median(timings),
+                    "mean": statistics.fmean(timings),
+                }
+                print(f"{name:<36} median {results[name]['median'] * 1000:10.2f} ms", file=sys.stderr)
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "repeat": repeat,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, tolerance, only=None):
+    """
+    Returns the names whose median got slower than baseline by more than
+    tolerance (0.10 = 10%), printing a ratio for every shared benchmark.
+    Benchmarks that were ok in the baseline but now error, are skipped or
+    are missing from the current run count as regressions too; only
+    limits the check to the benchmarks that --only selected.
+    """
+    regressions = []
+    for name, base in baseline["results"].items():
+        if base.get("status") != "ok" or (only and not any(pattern in name for pattern in only)):
+            continue
+        result = current["results"].get(name)
+        if result is None or result["status"] != "ok":
+            status = "missing" if result is None else result["status"]
+            regressions.append(name)
+            print(f"{name:<36} {status} (ok in baseline)  REGRESSION")
+            continue
+        ratio = result["median"] / base["median"]
+        flag = ""
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(f"{name:<36} {ratio:6.2f}x baseline{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark MEOW tools on synthetic fixtures.")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark")
+    parser.add_argument("--only", action="append", help="run benchmarks whose name contains this (repeatable)")
+    parser.add_argument("--output", help="write results JSON here")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown vs baseline (default 0.10)")
+    parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+
+    current = run_benchmarks(repeat=args.repeat, only=args.only)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(current, f, indent=2)
+    else:
+        print(json.dumps(current, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if compare(current, baseline, args.tolerance, only=args.only):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
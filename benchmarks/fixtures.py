@@ -0,0 +1,120 @@
+import os
+import struct
+import wave
+import zlib
+
+import numpy as np
+
+from programs.ffmpeg_exec import run_ffmpeg
+
+SAMPLE_RATE = 44100
+
+
+# ---------- PNG sequences ----------
+
+def _png_chunk(kind, data):
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+
+def write_png(path, rgb):
+    height, width, _ = rgb.shape
+    # every scanline starts with filter type 0
+    raw = np.concatenate([np.zeros((height, 1), dtype=np.uint8), rgb.reshape(height, -1)], axis=1)
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(_png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+        f.write(_png_chunk(b"IDAT", zlib.compress(raw.tobytes(), 1)))
+        f.write(_png_chunk(b"IEND", b""))
+
+
+def png_sequence(directory, frames, width, height, prefix="render_"):
+    """
+    Writes frames moving-gradient PNGs named like a render output
+    (<prefix>00000.png, ...), the layout compile_video and png_to_gif expect.
+    """
+    os.makedirs(directory, exist_ok=True)
+    rng = np.random.default_rng(0)
+    y, x = np.mgrid[0:height, 0:width]
+    for i in range(frames):
+        frame = np.empty((height, width, 3), dtype=np.uint8)
+        frame[..., 0] = (x + i * 4) % 256
+        frame[..., 1] = (y + i * 2) % 256
+        frame[..., 2] = rng.integers(0, 256, size=(height, width), dtype=np.uint8)
+        write_png(os.path.join(directory, f"{prefix}{i:05d}.png"), frame)
+    return directory
+
+
+# ---------- WAVs ----------
+
+def write_wav(path, samples, sample_rate=SAMPLE_RATE):
+    samples = np.atleast_2d(samples.T).T  # (n,) -> (n, 1)
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2")
+    with wave.open(path, "wb") as f:
+        f.setnchannels(pcm.shape[1])
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(pcm.tobytes())
+    return path
+
+
+def sine_wav(path, seconds, freq=440.0, channels=2):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    tone = 0.5 * np.sin(2 * np.pi * freq * t)
+    return write_wav(path, np.repeat(tone[:, None], channels, axis=1))
+
+
+def noise_wav(path, seconds, channels=2, seed=0):
+    rng = np.random.default_rng(seed)
+    return write_wav(path, rng.uniform(-0.5, 0.5, size=(int(seconds * SAMPLE_RATE), channels)))
+
+
+# ---------- MIDI ----------
+
+def _vlq(value):
+    out = [value & 0x7F]
+    value >>= 7
+    while value:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    return bytes(reversed(out))
+
+
+def _track(events):
+    data = b"".join(_vlq(delta) + body for delta, body in events) + b"\x00\xff\x2f\x00"
+    return b"MTrk" + struct.pack(">I", len(data)) + data
+
+
+def midi_file(path, tracks=4, notes_per_track=2000, tempos=(120, 90, 140, 100), ticks_per_beat=480):
+    """
+    Type 1 MIDI file: a tempo-map track with one tempo change per entry in
+    tempos, spread evenly, plus `tracks` note tracks of eighth notes.
+    """
+    rng = np.random.default_rng(0)
+    total_ticks = notes_per_track * ticks_per_beat // 2
+    tempo_events = []
+    for i, bpm in enumerate(tempos):
+        delta = 0 if i == 0 else total_ticks // len(tempos)
+        tempo_events.append((delta, b"\xff\x51\x03" + struct.pack(">I", int(60_000_000 / bpm))[1:]))
+
+    chunks = [_track(tempo_events)]
+    for channel in range(tracks):
+        events = []
+        for note, velocity in zip(rng.integers(36, 96, notes_per_track), rng.integers(40, 127, notes_per_track)):
+            events.append((0, bytes([0x90 | channel, int(note), int(velocity)])))
+            events.append((ticks_per_beat // 2, bytes([0x80 | channel, int(note), 0])))
+        chunks.append(_track(events))
+
+    with open(path, "wb") as f:
+        f.write(b"MThd" + struct.pack(">IHHH", 6, 1, len(chunks), ticks_per_beat))
+        f.write(b"".join(chunks))
+    return path
+
+
+# ---------- Video ----------
+
+def sample_video(path, seconds, width=640, height=360, fps=24):
+    run_ffmpeg(["-f", "lavfi", "-i", f"testsrc=size={width}x{height}:rate={fps}:duration={seconds}",
+                "-f", "lavfi", "-i", f"sine=frequency=440:duration={seconds}",
+                "-c:v", "libx264", "-preset", "ultrafast", "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest",
+                "-y", path])
+    return path
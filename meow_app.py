@@ -1,16 +1,35 @@
-from programs.FPS_BPM_Calc import fpsbpmlooper
-from programs.meow_record_calc import run_record_calculator
-from programs.ffmpeg_local import compile_video
 from termcolor import colored
-import subprocess
+import argparse
+import importlib
+import json
 import os
+import sys
 import termcolor
 
 
 COLORS = termcolor
 
+# Subprograms are imported on first use so the menu starts without pulling in
+# ffmpeg/tqdm/youtube_dl/numpy for tools that never run.
+PROGRAMS = {
+    "loop": ("programs.FPS_BPM_Calc", "fpsbpmlooper"),
+    "sample": ("programs.yt_to_mp3", "sample_youtube"),
+    "sampler": ("programs.yt_to_mp3", "main"),
+    "video": ("programs.ffmpeg_local", "compile_video"),
+    "gif": ("programs.png_to_gif", "png_to_gif"),
+    "calc": ("programs.meow_record_calc", "run_record_calculator"),
+    "batch": ("programs.batch", "run_manifest"),
+    "detect_tempo": ("programs.tempo", "detect_tempo"),
+    "tempo": ("programs.tempo", "analyze_library"),
+}
 
-def main():
+
+def load_program(name):
+    module_name, attr = PROGRAMS[name]
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def run_menu():
     while True:
         print("")
         for i in range(2):
@@ -35,19 +54,23 @@ def main():
             if choice == "1":
                 input_fps = int(
                     input(colored("Enter the FPS value: ", 'red')))
-                input_bpm = int(
-                    input(colored("Enter the BPM value: ", 'red')))
-                fpsbpmlooper(fps=input_fps, bpm=input_bpm)
+                input_bpm = input(
+                    colored("Enter the BPM value (or an audio file to detect it): ", 'red')).strip()
+                offset_frames = 0
+                if os.path.isfile(input_bpm):
+                    input_bpm, offset_frames = detect_loop_bpm(input_bpm, input_fps)
+                load_program("loop")(fps=input_fps, bpm=float(input_bpm), offset_frames=offset_frames)
             elif choice == "2":
-                subprocess.run(['python', './programs/yt_to_mp3.py'])
+                load_program("sampler")()
             elif choice == "3":
                 input_path = input((colored("Input Path: ", 'red')))
                 input_path = os.path.dirname(input_path)
-                compile_video(directory=input_path)
+                load_program("video")(directory=input_path)
             elif choice == "4":
-                subprocess.run(['python', './programs/png_to_gif.py'])
+                directory_path = input("Enter directory path: ")
+                load_program("gif")(directory_path)
             elif choice == "5":
-                run_record_calculator()
+                load_program("calc")()
             else:
                 print("Invalid choice.")
                 continue
@@ -57,5 +80,105 @@ def main():
             continue
 
 
+def detect_loop_bpm(audio_path, fps):
+    """Returns (bpm, frame of the first downbeat) detected from audio_path."""
+    analysis = load_program("detect_tempo")(audio_path)
+    if analysis["bpm"] is None:
+        raise ValueError(f"Could not detect a tempo for {audio_path}")
+    downbeat_frame = analysis["downbeat_offset"] * fps
+    print(colored("Detected BPM:", 'red') + f" {analysis['bpm']} " +
+          colored("|| first downbeat on frame:", 'red') + f" {downbeat_frame:.1f}")
+    return analysis["bpm"], downbeat_frame
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="meow", description="MEOW tools. Run without a command for the interactive menu.")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="record a timing/resource trace to PATH (same as MEOW_TRACE=PATH)")
+    commands = parser.add_subparsers(dest="command")
+
+    loop = commands.add_parser("loop", help="print loop/beat frames for an FPS and BPM")
+    loop.add_argument("--fps", type=int, required=True)
+    source = loop.add_mutually_exclusive_group(required=True)
+    source.add_argument("--bpm", type=float)
+    source.add_argument("--audio", help="detect the BPM from this audio file")
+
+    sample = commands.add_parser("sample", help="sample a YouTube video to MP3")
+    sample.add_argument("url")
+    sample.add_argument("--start", required=True, help="mm:ss")
+    sample.add_argument("--end", required=True, help="mm:ss")
+    sample.add_argument("--out", default=".", help="output directory")
+    sample.add_argument("--name", required=True, help="sample file name (no extension)")
+
+    video = commands.add_parser("video", help="compile a PNG sequence to MP4")
+    video.add_argument("directory")
+
+    gif = commands.add_parser("gif", help="compile a PNG sequence to GIF")
+    gif.add_argument("directory")
+
+    commands.add_parser("calc", help="run the record calculator")
+
+    tempo = commands.add_parser("tempo", help="detect BPM/downbeats for audio files or folders (cached)")
+    tempo.add_argument("paths", nargs="+")
+    tempo.add_argument("--workers", type=int, help="process pool size (default: CPU count)")
+    tempo.add_argument("--cache", help="cache file (default: ~/.meow/tempo_cache.json or MEOW_TEMPO_CACHE)")
+    tempo.add_argument("--json", action="store_true", help="print full results as JSON")
+
+    batch = commands.add_parser("batch", help="run a JSON/TOML job manifest headlessly")
+    batch.add_argument("manifest")
+    batch.add_argument("--workers", type=int, help="process pool size (default: manifest or CPU count)")
+    batch.add_argument("--ffmpeg-threads", type=int, help="total ffmpeg threads across running jobs")
+    batch.add_argument("--state", help="summary/resume file (default: <manifest>.state.json)")
+    return parser
+
+
+def run_command(args):
+    if args.command == "loop":
+        bpm, offset_frames = (args.bpm, 0) if args.audio is None else detect_loop_bpm(args.audio, args.fps)
+        load_program("loop")(fps=args.fps, bpm=bpm, interactive=False, offset_frames=offset_frames)
+    elif args.command == "sample":
+        to_seconds = importlib.import_module("programs.yt_to_mp3").to_seconds
+        load_program("sample")(args.url, to_seconds(args.start), to_seconds(args.end), args.out, args.name)
+    elif args.command == "video":
+        load_program("video")(directory=args.directory)
+    elif args.command == "gif":
+        load_program("gif")(args.directory)
+    elif args.command == "calc":
+        load_program("calc")()
+    elif args.command == "tempo":
+        results = load_program("tempo")(args.paths, workers=args.workers, cache_path=args.cache)
+        if args.json:
+            print(json.dumps(results, indent=2))
+            return
+        for path, result in results.items():
+            if "error" in result:
+                print(f"{path}: {colored(result['error'], 'red')}")
+            else:
+                print(f"{path}: {colored(str(result['bpm']), 'cyan')} BPM, downbeat at {result['downbeat_offset']}s")
+    elif args.command == "batch":
+        summary = load_program("batch")(args.manifest, state_path=args.state,
+                                        workers=args.workers, ffmpeg_threads=args.ffmpeg_threads)
+        if any(r["status"] != "ok" for r in summary.values()):
+            sys.exit(1)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    trace_path = args.trace or os.environ.get("MEOW_TRACE")
+    if trace_path:
+        # exported so batch workers trace too
+        os.environ["MEOW_TRACE"] = trace_path
+        tracing = importlib.import_module("programs.tracing")
+        tracing.enable(trace_path)
+    if args.command is None:
+        run_menu()
+    elif trace_path:
+        with tracing.span(f"meow {args.command}"):
+            run_command(args)
+    else:
+        run_command(args)
+
+
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
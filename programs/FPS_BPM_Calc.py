@@ -1,7 +1,9 @@
 import math
 from termcolor import colored
 
-def fpsbpmlooper(fps, bpm):
+def fpsbpmlooper(fps, bpm, interactive=True, offset_frames=0):
+    # offset_frames shifts the grid to start on a detected downbeat instead of frame 0
+    offset = int(round(offset_frames))
     while True:
         # # Prompt the user for the FPS value
         # fps = int(input("Enter the FPS value: "))
@@ -14,7 +16,10 @@ def fpsbpmlooper(fps, bpm):
         frames_per_beat = fps * seconds_per_beat
         frames_for_loop = frames_per_beat * 4
         perfect_loop_frame = frames_for_loop - (frames_for_loop % frames_per_beat)
+        perfect_loop_frame = perfect_loop_frame + offset
         perfect_loop_frame_int = int(perfect_loop_frame)
+        if offset:
+            print(colored("\nGrid starts on the first downbeat, frame:", 'red', attrs=['reverse']) + " " + colored(f" {offset}", 'cyan'))
         print(colored("\nA one bar loop will occur on frame:",'red', attrs=['reverse']) + " " + colored(f" {perfect_loop_frame_int} || Exact: {perfect_loop_frame}", 'cyan'))
 
         # Identify the frame numbers for half and quarter notes
@@ -26,18 +31,21 @@ def fpsbpmlooper(fps, bpm):
         print("\nFrames at which the half note occurs: \n")
         for i in range(int(frames_for_loop)):
             if i % int(half_note) == 0:
-                print(colored("{:>5} -- ".format(i), 'red'), end="")
+                print(colored("{:>5} -- ".format(i + offset), 'red'), end="")
         print("\n\n--------------------------------------------------\n")
         print("Frames at which the quarter note occurs: \n")
         for i in range(int(frames_for_loop)):
             if i % int(quarter_note) == 0:
-                print(colored("{:>5} -- ".format(i), 'red'), end="")
+                print(colored("{:>5} -- ".format(i + offset), 'red'), end="")
         print("\n\n--------------------------------------------------\n")
         print("Frames at which the eighth note occurs: \n")
         for i in range(int(frames_for_loop)):
             if i % int(eighth_note) == 0:
-                print(colored("{:>5} -- ".format(i), 'red'), end="")
+                print(colored("{:>5} -- ".format(i + offset), 'red'), end="")
         print("\n\n--------------------------------------------------\n")
+        # Scripted runs print the grid once and return
+        if not interactive:
+            break
         user_input = input("Enter 'x' to return to" + colored( " MEOW", 'red') + ": ")
         if user_input.lower() == "x":
             break
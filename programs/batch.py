@@ -0,0 +1,215 @@
+import importlib
+import json
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from programs import tracing
+from programs.ffmpeg_exec import encode_slots, use_encode_slots
+
+# job type -> (module, function); modules are imported inside the worker
+JOB_TYPES = {
+    "render": ("programs.ffmpeg_local", "compile_video"),
+    "gif": ("programs.png_to_gif", "png_to_gif"),
+    "audio_slice": ("programs.fuckitup", "slice_audio"),
+    "video_slice": ("programs.fuckitup_video", "slice_video"),
+    "pitch": ("programs.shift_pitch", "change_pitch"),
+    "midi_csv": ("programs.midi_to_csv", "convert_midi_to_csv"),
+    "midi_osc": ("programs.midi_to_osc", "convert_midi_to_osc"),
+    "pnl_sweep": ("programs.batch", "pnl_sweep"),
+}
+
+# job types that shell out to ffmpeg and take a threads= argument (the
+# slicers also use it to cap their tempo-detection decodes)
+FFMPEG_JOBS = {"render", "gif", "video_slice", "audio_slice"}
+# job types that print live ffmpeg progress unless given progress=False;
+# parallel workers would interleave it with the batch log
+PROGRESS_JOBS = {"render", "gif", "video_slice"}
+# job types that run ffmpeg through pydub, which can't be given -threads;
+# they hold one thread of the budget unless the job says otherwise
+PYDUB_JOBS = {"pitch"}
+
+
+def load_manifest(path):
+    """
+    Reads a JSON or TOML manifest:
+
+      workers         - process pool size (default: CPU count)
+      ffmpeg_threads  - total ffmpeg threads allowed at once (default: CPU count)
+      jobs            - list of {id, type, args, after (optional), threads (optional)}
+    """
+    if path.lower().endswith(".toml"):
+        import tomllib
+        with open(path, "rb") as f:
+            manifest = tomllib.load(f)
+    else:
+        with open(path) as f:
+            manifest = json.load(f)
+
+    jobs = manifest.get("jobs", [])
+    ids = [job["id"] for job in jobs]
+    if len(set(ids)) != len(ids):
+        raise ValueError("job ids must be unique")
+    for job in jobs:
+        if job.get("type") not in JOB_TYPES:
+            raise ValueError(f"{job['id']}: unknown job type {job.get('type')!r}")
+        for dep in job.get("after", []):
+            if dep not in ids:
+                raise ValueError(f"{job['id']}: unknown dependency {dep!r}")
+    _check_acyclic(jobs)
+    return manifest
+
+
+def _check_acyclic(jobs):
+    after = {job["id"]: job.get("after", []) for job in jobs}
+    done = set()
+    for job_id in after:
+        path = [job_id]
+        stack = [iter(after[job_id])]
+        while stack:
+            dep = next(stack[-1], None)
+            if dep is None:
+                done.add(path.pop())
+                stack.pop()
+            elif dep in path:
+                raise ValueError(f"dependency cycle: {' -> '.join(path + [dep])}")
+            elif dep not in done:
+                path.append(dep)
+                stack.append(iter(after[dep]))
+
+
+def run_job(job_type, args, threads=None):
+    module_name, attr = JOB_TYPES[job_type]
+    func = getattr(importlib.import_module(module_name), attr)
+    if job_type in FFMPEG_JOBS:
+        args = dict(args, threads=threads)
+    if job_type in PROGRESS_JOBS:
+        args = dict(args)
+        args.setdefault("progress", False)
+    if job_type == "render":
+        args.setdefault("reveal", False)
+    try:
+        with tracing.span(f"job:{job_type}", args=args):
+            result = func(**args)
+    finally:
+        # pool workers never run atexit hooks, so flush after every job
+        tracing.write()
+    # keep the summary JSON-friendly
+    return result if isinstance(result, (str, int, float, bool, type(None))) else repr(result)
+
+
+def pnl_sweep(output, unit_price=None, units=None, sell_through=None, marketing=None,
+              manufacturing=None, release_costs=None, sales=None, fees=None):
+    """
+    Manifest wrapper for compute_release_pnl_grid. Axes are lists or
+    {"start", "stop", "num"} linspaces; the dataclass overrides are dicts.
+    """
+    import numpy as np
+    from programs.meow_record_calc import (
+        Manufacturing, ReleaseCosts, SalesPlan, ShopifyFees,
+        compute_release_pnl_grid, export_pnl_grid,
+    )
+
+    def axis(value):
+        if isinstance(value, dict):
+            return np.linspace(value["start"], value["stop"], int(value["num"]))
+        return value
+
+    grid = compute_release_pnl_grid(
+        Manufacturing(**(manufacturing or {})),
+        ReleaseCosts(**(release_costs or {})),
+        SalesPlan(**(sales or {})),
+        ShopifyFees(**(fees or {})),
+        unit_price=axis(unit_price),
+        units=axis(units),
+        sell_through=axis(sell_through),
+        marketing=axis(marketing),
+    )
+    return export_pnl_grid(grid, output)
+
+
+def _load_state(state_path):
+    if os.path.exists(state_path):
+        with open(state_path) as f:
+            return json.load(f)
+    return {}
+
+
+def _save_state(state_path, state):
+    tmp_path = state_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, state_path)
+
+
+def run_manifest(path, state_path=None, workers=None, ffmpeg_threads=None):
+    """
+    Runs every job in the manifest on one process pool and returns the
+    per-job summary {id: {status, seconds, result | error}}.
+
+    Jobs start once everything in their "after" list succeeded; jobs whose
+    dependencies failed are marked "skipped". The summary is rewritten to
+    state_path (default: <manifest>.state.json) after each job, and jobs
+    already marked "ok" there are not run again, so an interrupted batch
+    picks up where it stopped.
+    """
+    manifest = load_manifest(path)
+    state_path = state_path or os.path.splitext(path)[0] + ".state.json"
+    workers = workers or manifest.get("workers") or os.cpu_count() or 1
+    thread_budget = ffmpeg_threads or manifest.get("ffmpeg_threads") or os.cpu_count() or 1
+    default_threads = max(1, thread_budget // workers)
+
+    jobs = {job["id"]: job for job in manifest["jobs"]}
+    state = {job_id: r for job_id, r in _load_state(state_path).items() if job_id in jobs and r["status"] == "ok"}
+    pending = [job_id for job_id in jobs if job_id not in state]
+    running = {}
+    threads_in_use = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=use_encode_slots, initargs=(encode_slots(),)) as pool:
+        while pending or running:
+            # skip anything downstream of a failure
+            for job_id in list(pending):
+                if any(state.get(dep, {}).get("status") in ("failed", "skipped") for dep in jobs[job_id].get("after", [])):
+                    pending.remove(job_id)
+                    state[job_id] = {"status": "skipped", "seconds": 0.0, "error": "dependency did not succeed"}
+                    print(f"[skip] {job_id}")
+            _save_state(state_path, state)
+
+            for job_id in list(pending):
+                if len(running) >= workers:
+                    break
+                job = jobs[job_id]
+                if not all(state.get(dep, {}).get("status") == "ok" for dep in job.get("after", [])):
+                    continue
+                threads = None
+                if job["type"] in FFMPEG_JOBS or job["type"] in PYDUB_JOBS:
+                    job_default = default_threads if job["type"] in FFMPEG_JOBS else 1
+                    threads = min(thread_budget, int(job.get("threads", job_default)))
+                    if threads_in_use + threads > thread_budget:
+                        continue
+                    threads_in_use += threads
+                pending.remove(job_id)
+                future = pool.submit(run_job, job["type"], job.get("args", {}), threads)
+                running[future] = (job_id, threads or 0, time.perf_counter())
+                print(f"[start] {job_id}")
+
+            if not running:
+                # everything left was just marked skipped
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                job_id, threads, started = running.pop(future)
+                threads_in_use -= threads
+                seconds = round(time.perf_counter() - started, 3)
+                try:
+                    state[job_id] = {"status": "ok", "seconds": seconds, "result": future.result()}
+                    print(f"[ok] {job_id} ({seconds}s)")
+                except Exception as e:
+                    error = "".join(traceback.format_exception_only(type(e), e)).strip()
+                    state[job_id] = {"status": "failed", "seconds": seconds, "error": error}
+                    print(f"[failed] {job_id}: {error}")
+            _save_state(state_path, state)
+
+    return state
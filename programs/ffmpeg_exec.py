@@ -0,0 +1,175 @@
+import multiprocessing
+import os
+import subprocess
+import threading
+from collections import deque
+from programs.tracing import span
+
+# Max ffmpeg runs at once across a MEOW process and its pool workers
+# (batch jobs, tempo scans), which share one semaphore via use_encode_slots.
+# Code that starts ffmpeg some other way (pydub) holds a slot with
+# "with encode_slots():".
+MAX_CONCURRENT_ENCODES = int(os.environ.get("MEOW_FFMPEG_JOBS", os.cpu_count() or 1))
+STDERR_TAIL_LINES = 40
+
+_encode_slots = None
+
+
+def encode_slots():
+    """
+    The process-shared semaphore capping concurrent ffmpeg runs; use it
+    as a context manager around anything that starts ffmpeg.
+    """
+    global _encode_slots
+    if _encode_slots is None:
+        _encode_slots = multiprocessing.BoundedSemaphore(MAX_CONCURRENT_ENCODES)
+    return _encode_slots
+
+
+def use_encode_slots(slots):
+    """
+    ProcessPoolExecutor initializer: makes a worker share its parent's
+    slots, e.g. initializer=use_encode_slots, initargs=(encode_slots(),).
+    """
+    global _encode_slots
+    _encode_slots = slots
+
+
+class FFmpegError(RuntimeError):
+    def __init__(self, command, returncode, stderr_tail):
+        self.command = command
+        self.returncode = returncode
+        self.stderr_tail = stderr_tail
+        super().__init__(f"ffmpeg exited with code {returncode}:\n" + "\n".join(stderr_tail))
+
+
+def _parse_progress(block):
+    # -progress writes key=value lines; N/A shows up before the first frame
+    def number(key, cast=float):
+        try:
+            return cast(block[key])
+        except (KeyError, ValueError):
+            return None
+
+    try:
+        # padded to a fixed width, e.g. "   1x" or " 2.5x"
+        speed = float(block.get("speed", "").strip().rstrip("x"))
+    except ValueError:
+        speed = None
+    out_time_us = number("out_time_us", int)
+    if out_time_us is None:
+        out_time_us = number("out_time_ms", int)  # also microseconds, despite the name
+    return {
+        "frame": number("frame", int),
+        "fps": number("fps"),
+        "speed": speed,
+        "out_time": out_time_us / 1e6 if out_time_us is not None else None,
+        "total_size": number("total_size", int),
+        "done": block.get("progress") == "end",
+    }
+
+
+def print_progress(progress):
+    parts = []
+    if progress["frame"] is not None:
+        parts.append(f"frame {progress['frame']:>6}")
+    if progress["fps"] is not None:
+        parts.append(f"fps {progress['fps']:>6.1f}")
+    if progress["speed"] is not None:
+        parts.append(f"speed {progress['speed']:>5.2f}x")
+    if progress["out_time"] is not None:
+        parts.append(f"time {progress['out_time']:>8.2f}s")
+    print("\r  " + "  ".join(parts), end="\n" if progress["done"] else "", flush=True)
+
+
+def run_ffmpeg(args, threads=None, on_progress=None):
+    """
+    Runs ffmpeg with an argument list (never a shell string).
+
+    args is everything after "ffmpeg", ending with the output path;
+    -threads is inserted just before it. on_progress gets a dict of
+    frame/fps/speed/out_time/total_size/done for every -progress update.
+    Only the last STDERR_TAIL_LINES of stderr are kept, and raised in
+    FFmpegError on failure. Returns the final progress dict.
+    """
+    command = ["ffmpeg", "-hide_banner", "-nostdin", "-nostats", "-progress", "pipe:1", *args]
+    if threads:
+        command[-1:-1] = ["-threads", str(threads)]
+
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    last = None
+    with encode_slots(), span("ffmpeg", output=args[-1], threads=threads) as encode:
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                text=True, errors="replace")
+        # drain stderr on the side so a chatty encode can't fill the pipe
+        drain = threading.Thread(target=lambda: stderr_tail.extend(line.rstrip() for line in proc.stderr), daemon=True)
+        drain.start()
+
+        block = {}
+        for line in proc.stdout:
+            key, _, value = line.strip().partition("=")
+            block[key] = value
+            if key == "progress":
+                last = _parse_progress(block)
+                if on_progress:
+                    on_progress(last)
+                block = {}
+        returncode = proc.wait()
+        drain.join()
+        if last:
+            encode.set(frames=last["frame"], output_bytes=last["total_size"])
+
+    if returncode != 0:
+        raise FFmpegError(command, returncode, list(stderr_tail))
+    return last
+
+
+def stream_ffmpeg(args, block_size=1 << 16):
+    """
+    Runs ffmpeg with its output on pipe:1 and yields it in block_size
+    chunks, so callers can decode arbitrarily long inputs in bounded
+    memory. Closing the generator early stops ffmpeg.
+    """
+    command = ["ffmpeg", "-hide_banner", "-nostdin", "-nostats", "-loglevel", "error", *args]
+
+    stderr_tail = deque(maxlen=STDERR_TAIL_LINES)
+    with encode_slots(), span("ffmpeg stream", input=args[args.index("-i") + 1] if "-i" in args else None):
+        proc = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        drain = threading.Thread(
+            target=lambda: stderr_tail.extend(line.decode(errors="replace").rstrip() for line in proc.stderr), daemon=True)
+        drain.start()
+
+        finished = False
+        try:
+            while True:
+                chunk = proc.stdout.read(block_size)
+                if not chunk:
+                    break
+                yield chunk
+            finished = True
+        finally:
+            if not finished:
+                proc.kill()
+            proc.stdout.close()
+            returncode = proc.wait()
+            drain.join()
+
+    if returncode != 0:
+        raise FFmpegError(command, returncode, list(stderr_tail))
+
+
+def parse_duration_seconds(duration_line):
+    duration_value = duration_line.split("Duration:")[1].split(",")[0].strip()
+    hours_str, minutes_str, seconds_str = duration_value.split(":")
+    return int(hours_str) * 3600 + int(minutes_str) * 60 + float(seconds_str)
+
+
+def probe_duration(path):
+    # ffmpeg with no output exits non-zero but still prints the input header
+    with encode_slots(), span("probe_duration", path=path):
+        result = subprocess.run(["ffmpeg", "-hide_banner", "-nostdin", "-i", path],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, errors="replace")
+    duration_lines = [line for line in result.stderr.splitlines() if "Duration:" in line]
+    if not duration_lines:
+        raise FFmpegError(["ffmpeg", "-i", path], result.returncode, result.stderr.splitlines()[-STDERR_TAIL_LINES:])
+    return parse_duration_seconds(duration_lines[0])
@@ -1,10 +1,12 @@
 import os
 import subprocess
 from termcolor import colored
-from tqdm import tqdm
+from programs.ffmpeg_exec import run_ffmpeg, print_progress
+from programs.tracing import span, traced
 
 
-def compile_video(directory):
+@traced()
+def compile_video(directory, threads=None, reveal=True, progress=True):
     # Get all the png files in the specified directory
     files = [f for f in os.listdir(directory) if f.endswith('.png')]
     # Sort the files by name
@@ -21,22 +23,27 @@ def compile_video(directory):
 
     print(colored("Renaming files...", 'cyan'))
     # Rename the files
-    for i, file in tqdm(enumerate(files)):
-        os.rename(os.path.join(directory, file), os.path.join(
-            directory, f'{i:0{digits_count}d}.png'))
+    with span("rename files", files=len(files)):
+        for i, file in enumerate(files):
+            os.rename(os.path.join(directory, file), os.path.join(
+                directory, f'{i:0{digits_count}d}.png'))
 
     print(colored("Compiling video...", 'cyan'))
     # Compile the video using FFmpeg
-    subprocess.run(['ffmpeg', '-framerate', '24', '-i', f'{directory}/%0{digits_count}d.png', '-c:v', 'libx264', '-r',
-                   '24', '-pix_fmt', 'yuv420p', '-y', f'{directory}/output.mp4'], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    run_ffmpeg(['-framerate', '24', '-i', f'{directory}/%0{digits_count}d.png', '-c:v', 'libx264', '-r',
+                '24', '-pix_fmt', 'yuv420p', '-y', f'{directory}/output.mp4'], threads=threads, on_progress=print_progress if progress else None)
     print(colored("      COMPLETED       \n", 'cyan', attrs=['reverse']))
 
     # Open the video in file explorer
     output_file = os.path.join(directory, 'output.mp4')
     output_file = os.path.abspath(output_file)
     print("File Location: " + colored(f"{output_file}", 'cyan'))
+    # Headless runs (batch jobs) skip opening Explorer
+    if not reveal:
+        return output_file
     subprocess.run(['explorer', output_file])
 
     output_file_parent_directory = os.path.dirname(output_file)
     subprocess.run(['explorer', output_file_parent_directory],
                    stdout=subprocess.DEVNULL, stderr=subprocess.STDOUT)
+    return output_file
@@ -1,55 +1,97 @@
 import os
 import random
 from pydub import AudioSegment
+from programs.ffmpeg_exec import encode_slots
+from programs.tempo import analyze_library, random_bar_start
+from programs.tracing import span, traced
 
-# Prompt user for input directory, BPM, and output audio file
-input_dir = input("Enter input directory: ")
-while not os.path.isdir(input_dir):
-    print("Invalid directory. Please enter a valid directory.")
+
+@traced()
+def slice_audio(input_dir, bpm, output_audio, threads=None):
+    # bpm=None detects tempo and downbeat per file (cached) and cuts on the bar grid;
+    # threads caps how many files are decoded for detection at once
+    # Get all audio files in input directory
+    audio_files = [f for f in os.listdir(input_dir) if f.endswith(".mp3") or f.endswith(".wav")]
+    if len(audio_files) == 0:
+        raise FileNotFoundError(f"No audio files found in '{input_dir}'.")
+
+    analyses = {}
+    if not bpm:
+        # one cached, parallel pass over every file instead of a cache round trip per file
+        analyses = analyze_library([os.path.join(input_dir, f) for f in audio_files], workers=threads)
+
+    # Loop through audio files
+    sliced = 0
+    for file in audio_files:
+        file_bpm, downbeat_ms = bpm, None
+        if not file_bpm:
+            analysis = analyses[os.path.join(input_dir, file)]
+            if analysis.get("bpm") is None:
+                print(f"Could not detect a tempo for {file} ({analysis.get('error', 'no clear beat')}), skipping.")
+                continue
+            file_bpm, downbeat_ms = analysis["bpm"], analysis["downbeat_offset"] * 1000
+            print(f"{file}: {file_bpm} BPM, first downbeat at {downbeat_ms:.0f} ms")
+        # Calculate length of one bar in milliseconds
+        beat_length = 60000 / file_bpm
+        one_bar_length = beat_length * 4
+        slice_length = int(one_bar_length / 4)
+
+        # Open audio file
+        with encode_slots(), span("decode", file=file):
+            audio = AudioSegment.from_file(os.path.join(input_dir, file))
+        # Get the duration of the audio
+        duration = len(audio)
+        # Randomly select a portion of the audio to slice
+        max_start = max(0, duration - int(one_bar_length))
+        if downbeat_ms is None:
+            start = random.randint(0, max_start)
+        else:
+            start = int(random_bar_start(duration, one_bar_length, downbeat_ms))
+        end = start + one_bar_length
+        # Slice the audio
+        sliced_audio = audio[start:end]
+        # Reorder slices randomly
+        slices = [sliced_audio[i:i+slice_length] for i in range(0, len(sliced_audio), slice_length)]
+        random.shuffle(slices)
+        # Concatenate slices back together in a loop
+        loop = slices[0].empty()
+        for s in slices:
+            loop += s
+        # Make sure the output audio is exactly one bar loop
+        loop = loop.set_channels(1).set_frame_rate(44100)
+        while len(loop) < one_bar_length:
+            loop += AudioSegment.silent(duration=10)
+        while len(loop) > one_bar_length:
+            loop = loop[:len(loop) - 10]
+        # Save loop to output file
+        with encode_slots(), span("encode", file=output_audio):
+            loop.export(output_audio, format="mp3")
+        sliced += 1
+
+    if sliced == 0:
+        raise ValueError(f"Could not detect a tempo for any audio file in '{input_dir}'.")
+
+
+def main():
+    # Prompt user for input directory, BPM, and output audio file
     input_dir = input("Enter input directory: ")
+    while not os.path.isdir(input_dir):
+        print("Invalid directory. Please enter a valid directory.")
+        input_dir = input("Enter input directory: ")
+
+    bpm = input("Enter BPM (leave blank to detect it): ").strip()
+    bpm = float(bpm) if bpm else None
+    while bpm is not None and bpm <= 0:
+        print("Invalid BPM. Please enter a positive number.")
+        bpm = float(input("Enter BPM: "))
+
+    output_audio = input("Enter output audio file name (including the extension): ")
+
+    try:
+        slice_audio(input_dir, bpm, output_audio)
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+
 
-bpm = int(input("Enter BPM: "))
-while bpm <= 0:
-    print("Invalid BPM. Please enter a positive number.")
-    bpm = int(input("Enter BPM: "))
-
-output_audio = input("Enter output audio file name (including the extension): ")
-
-# Calculate length of one bar in milliseconds
-beat_length = 60000 / bpm
-one_bar_length = beat_length * 4
-slice_length = int(one_bar_length / 4)
-
-# Get all audio files in input directory
-audio_files = [f for f in os.listdir(input_dir) if f.endswith(".mp3") or f.endswith(".wav")]
-if len(audio_files) == 0:
-    print("No audio files found in the directory.")
-    exit()
-
-# Loop through audio files
-for file in audio_files:
-    # Open audio file
-    audio = AudioSegment.from_file(os.path.join(input_dir, file))
-    # Get the duration of the audio
-    duration = len(audio)
-    # Randomly select a portion of the audio to slice
-    max_start = max(0, duration - int(one_bar_length))
-    start = random.randint(0, max_start)
-    end = start + one_bar_length
-    # Slice the audio
-    sliced_audio = audio[start:end]
-    # Reorder slices randomly
-    slices = [sliced_audio[i:i+slice_length] for i in range(0, len(sliced_audio), slice_length)]
-    random.shuffle(slices)
-    # Concatenate slices back together in a loop
-    loop = slices[0].empty()
-    for s in slices:
-        loop += s
-    # Make sure the output audio is exactly one bar loop
-    loop = loop.set_channels(1).set_frame_rate(44100)
-    while len(loop) < one_bar_length:
-        loop += AudioSegment.silent(duration=10)
-    while len(loop) > one_bar_length:
-        loop = loop[:len(loop) - 10]
-    # Save loop to output file
-    loop.export(output_audio, format="mp3")
+if __name__ == "__main__":
+    main()
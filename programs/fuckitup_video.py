@@ -1,53 +1,86 @@
 import os
 import random
-import subprocess
+import tempfile
+from programs.ffmpeg_exec import probe_duration, run_ffmpeg, print_progress
+from programs.tempo import analyze_library, random_bar_start
+from programs.tracing import span, traced
 
-def parse_duration_seconds(duration_line):
-    duration_value = duration_line.split("Duration:")[1].split(",")[0].strip()
-    hours_str, minutes_str, seconds_str = duration_value.split(":")
-    return int(hours_str) * 3600 + int(minutes_str) * 60 + float(seconds_str)
 
-# Prompt user for input directory, BPM, and output video file
-input_dir = input("Enter input directory: ")
-while not os.path.isdir(input_dir):
-    print("Invalid directory. Please enter a valid directory.")
+@traced()
+def slice_video(input_dir, bpm, output_video, threads=None, progress=True):
+    # bpm=None detects tempo and downbeat from each video's audio (cached) and cuts on the beat grid
+    # Get all video files in input directory
+    video_files = [f for f in os.listdir(input_dir) if f.endswith(".mp4")]
+    if len(video_files) == 0:
+        raise FileNotFoundError(f"No video files found in '{input_dir}'.")
+
+    analyses = {}
+    if not bpm:
+        # one cached, parallel pass over every file instead of a cache round trip per file
+        analyses = analyze_library([os.path.join(input_dir, f) for f in video_files], workers=threads)
+
+    # Loop through video files
+    sliced = 0
+    for file in video_files:
+        input_file = os.path.join(input_dir, file)
+        file_bpm, downbeat = bpm, None
+        if not file_bpm:
+            analysis = analyses[input_file]
+            if analysis.get("bpm") is None:
+                print(f"Could not detect a tempo for {file} ({analysis.get('error', 'no clear beat')}), skipping.")
+                continue
+            file_bpm, downbeat = analysis["bpm"], analysis["downbeat_offset"]
+            print(f"{file}: {file_bpm} BPM, first downbeat at {downbeat:.2f}s")
+        # Calculate length of one beat in seconds
+        beat_length = 60 / file_bpm
+        slice_length = beat_length / 4
+        # Get the duration of the video
+        duration = probe_duration(input_file)
+        # Randomly select a portion of the video to slice
+        max_start = max(0, duration - (slice_length * 4))
+        if downbeat is None:
+            start = random.uniform(0, max_start)
+        else:
+            start = random_bar_start(duration, slice_length * 4, downbeat)
+        with tempfile.TemporaryDirectory() as frames_dir:
+            # Use FFmpeg to extract the frames from the selected portion of the video
+            run_ffmpeg(['-ss', str(start), '-t', str((slice_length * 4)), '-i', input_file, '-vf', r'select=not(mod(n\,100))', '-vsync', 'vfr',
+                        os.path.join(frames_dir, 'frame%03d.jpg')], threads=threads)
+            # Shuffle the frames by renaming them into a new random order
+            with span("shuffle frames"):
+                frames = [f for f in os.listdir(frames_dir) if f.startswith("frame") and f.endswith(".jpg")]
+                random.shuffle(frames)
+                for i, frame in enumerate(frames):
+                    os.rename(os.path.join(frames_dir, frame), os.path.join(frames_dir, f'{i:03d}.jpg'))
+            # Use FFmpeg to create a new video from the randomly ordered frames
+            run_ffmpeg(['-framerate', '24', '-i', os.path.join(frames_dir, '%03d.jpg'), '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-y',
+                        'output_'+output_video], threads=threads, on_progress=print_progress if progress else None)
+        sliced += 1
+
+    if sliced == 0:
+        raise ValueError(f"Could not detect a tempo for any video file in '{input_dir}'.")
+
+
+def main():
+    # Prompt user for input directory, BPM, and output video file
     input_dir = input("Enter input directory: ")
+    while not os.path.isdir(input_dir):
+        print("Invalid directory. Please enter a valid directory.")
+        input_dir = input("Enter input directory: ")
+
+    bpm = input("Enter BPM (leave blank to detect it): ").strip()
+    bpm = float(bpm) if bpm else None
+    while bpm is not None and bpm <= 0:
+        print("Invalid BPM. Please enter a positive number.")
+        bpm = float(input("Enter BPM: "))
+
+    output_video = input("Enter output video file name (including the extension): ")
+
+    try:
+        slice_video(input_dir, bpm, output_video)
+    except (FileNotFoundError, ValueError) as e:
+        print(e)
+
 
-bpm = int(input("Enter BPM: "))
-while bpm <= 0:
-    print("Invalid BPM. Please enter a positive number.")
-    bpm = int(input("Enter BPM: "))
-
-output_video = input("Enter output video file name (including the extension): ")
-
-# Calculate length of one beat in seconds
-beat_length = 60 / bpm
-slice_length = beat_length / 4
-
-# Get all video files in input directory
-video_files = [f for f in os.listdir(input_dir) if f.endswith(".mp4")]
-if len(video_files) == 0:
-    print("No video files found in the directory.")
-    exit()
-
-# Loop through video files
-for file in video_files:
-    # Get the duration of the video
-    output = subprocess.check_output(['ffmpeg', '-i', os.path.join(input_dir, file), '-vstats', '2>&1'])
-    duration_line = [line for line in output.decode().split("\n") if "Duration" in line][0]
-    duration = parse_duration_seconds(duration_line)
-    # Randomly select a portion of the video to slice
-    max_start = max(0, duration - (slice_length * 4))
-    start = random.uniform(0, max_start)
-    end = start + (slice_length * 4)
-    # Use FFmpeg to extract the frames from the selected portion of the video
-    output = subprocess.check_output(['ffmpeg', '-i', os.path.join(input_dir, file), '-ss', str(start), '-t', str((slice_length * 4)), '-vf', 'select=not(mod(n\,100))', '-vsync', 'vfr', 'frames/frame%03d.jpg'])
-    # Get all the frames in the frames directory
-    frames = [f for f in os.listdir("frames/") if f.endswith(".jpg")]
-    random.shuffle(frames)
-    # Use FFmpeg to create a new video from the randomly ordered frames
-    output = subprocess.check_output(['ffmpeg', '-framerate', '24', '-i', 'frames/%03d.jpg', '-c:v', 'libx264', '-pix_fmt', 'yuv420p', 'output_'+output_video])
-    # Clean up the frames directory
-    for frame in frames:
-        os.remove("frames/"+frame)
-    os.rmdir("frames/")
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,13 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from datetime import date
-from typing import List, Dict, Tuple, Optional
+from typing import List, Dict, Tuple, Optional, Union, Sequence
 import math
 
+import numpy as np
+
+from programs.tracing import traced
+
 # ---------- Utils ----------
 
 def money(x: float) -> str:
@@ -160,6 +164,166 @@ def compute_release_pnl(
         "break_even_price_including_processing": break_even_price,
     }
 
+ArrayLike = Union[float, Sequence[float], np.ndarray]
+
+PNL_GRID_AXES = ("unit_price", "units", "sell_through", "marketing")
+CSV_BLOCK_ROWS = 1 << 16
+
+@traced()
+def compute_release_pnl_grid(
+    mfg: Manufacturing,
+    fixed: ReleaseCosts,
+    sales: SalesPlan,
+    fees: ShopifyFees,
+    unit_price: Optional[ArrayLike] = None,
+    units: Optional[ArrayLike] = None,
+    sell_through: Optional[ArrayLike] = None,
+    marketing: Optional[ArrayLike] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Vectorized compute_release_pnl over every combination of the sweep axes.
+
+    Each axis is a scalar, list, range or array; axes left as None use the
+    value from the dataclasses. The result has one array per P&L field,
+    shaped (len(unit_price), len(units), len(sell_through), len(marketing)).
+
+    When units is swept, manufacturing_total scales with mfg.cost_per_unit.
+    """
+    axes = {
+        "unit_price": sales.unit_price if unit_price is None else unit_price,
+        "units": mfg.units if units is None else units,
+        "sell_through": sales.sell_through if sell_through is None else sell_through,
+        "marketing": fixed.marketing if marketing is None else marketing,
+    }
+    axes = {k: np.atleast_1d(np.asarray(v, dtype=float)) for k, v in axes.items()}
+    if np.any(axes["units"] <= 0):
+        raise ValueError("units must be positive")
+
+    price, n_units, through, mkt = np.meshgrid(
+        axes["unit_price"], axes["units"], axes["sell_through"], axes["marketing"],
+        indexing="ij", sparse=True,
+    )
+    shape = tuple(len(axes[k]) for k in PNL_GRID_AXES)
+
+    units_sold = np.rint(n_units * through)
+    gross_revenue = units_sold * price
+    est_orders = np.ceil(units_sold / max(1e-9, sales.avg_units_per_order))
+    processing_fees = gross_revenue * fees.rate + est_orders * fees.fixed_per_order
+
+    manufacturing_total = n_units * mfg.cost_per_unit if units is not None else np.full_like(n_units, mfg.manufacturing_total)
+    fixed_total = mkt + fixed.mastering + fixed.artwork
+    total_cost_basis = manufacturing_total + fixed_total
+    net_profit_pre_tax = (gross_revenue - processing_fees) - total_cost_basis
+
+    # same break-even formula as compute_release_pnl, inf where nothing sells
+    denom = units_sold * (1 - fees.rate)
+    break_even_price = np.divide(
+        total_cost_basis + est_orders * fees.fixed_per_order,
+        denom,
+        out=np.full(np.broadcast_shapes(total_cost_basis.shape, denom.shape), np.inf),
+        where=denom > 0,
+    )
+
+    def full(a) -> np.ndarray:
+        return np.broadcast_to(a, shape)
+
+    return {
+        "unit_price": full(price),
+        "units": full(n_units),
+        "sell_through": full(through),
+        "marketing": full(mkt),
+        "units_sold": full(units_sold),
+        "manufacturing_total": full(manufacturing_total),
+        "fixed_total": full(fixed_total),
+        "total_cost_basis": full(total_cost_basis),
+        "manufacturing_cost_per_unit": full(manufacturing_total / n_units),
+        "all_in_cost_per_unit": full(total_cost_basis / n_units),
+        "gross_revenue": full(gross_revenue),
+        "est_orders": full(est_orders),
+        "processing_fees": full(processing_fees),
+        "net_profit_pre_tax": full(net_profit_pre_tax),
+        "break_even_price_including_processing": full(break_even_price),
+    }
+
+def _format_cells(values: np.ndarray) -> np.ndarray:
+    """
+    "%.10g" strings for every cell of values, flattened. Grid columns are
+    mostly broadcast views (stride 0 along the axes they don't depend on),
+    so each stored value is formatted once and the strings are broadcast.
+    """
+    stored = values[tuple(slice(None) if stride else slice(0, 1) for stride in values.strides)]
+    text = np.array(["%.10g" % v for v in stored.ravel().tolist()], dtype=object).reshape(stored.shape)
+    return np.broadcast_to(text, values.shape).ravel()
+
+@traced()
+def export_pnl_grid(grid: Dict[str, np.ndarray], path: str) -> str:
+    """
+    Writes a compute_release_pnl_grid result to disk, one row per grid cell.
+      .csv -> header row + one column per field
+      .npy -> structured array with one named field per column (fastest)
+    """
+    columns = list(grid.keys())
+    if path.lower().endswith(".npy"):
+        table = np.empty(grid[columns[0]].size, dtype=[(c, "f8") for c in columns])
+        for c in columns:
+            table[c] = grid[c].ravel()
+        np.save(path, table)
+    elif path.lower().endswith(".csv"):
+        # same text as np.savetxt(fmt="%.10g"), which formats cell by cell
+        # in Python; rows are joined and written CSV_BLOCK_ROWS at a time
+        shape = np.broadcast_shapes(*(grid[c].shape for c in columns))
+        cells = [_format_cells(np.broadcast_to(grid[c], shape)) for c in columns]
+        with open(path, "w") as f:
+            f.write(",".join(columns) + "\n")
+            for start in range(0, cells[0].size, CSV_BLOCK_ROWS):
+                rows = zip(*(c[start:start + CSV_BLOCK_ROWS].tolist() for c in cells))
+                f.write("\n".join(map(",".join, rows)) + "\n")
+    else:
+        raise ValueError(f"unsupported export format: {path} (use .csv or .npy)")
+    return path
+
+def allocate_units_by_month(units_sold_total: int, weights: Sequence[float]) -> np.ndarray:
+    """
+    Rounds units_sold_total * weights to integers that sum exactly to
+    units_sold_total. Rounding drift is spread one unit per month,
+    starting from the first month.
+    """
+    units_by_month = np.rint(units_sold_total * np.asarray(weights, dtype=float)).astype(np.int64)
+    months = len(units_by_month)
+    drift = units_sold_total - int(units_by_month.sum())
+    if drift and months:
+        per_month, extra = divmod(abs(drift), months)
+        step = np.full(months, per_month, dtype=np.int64)
+        step[:extra] += 1
+        units_by_month += step if drift > 0 else -step
+    return units_by_month
+
+def release_cash_out_events(
+    mfg: Manufacturing,
+    fixed: ReleaseCosts,
+    sched: CashFlowSchedule,
+) -> List[Tuple[int, float, str]]:
+    """
+    Returns (month_offset, amount, label) for every outflow of one release,
+    with month offsets relative to sched.release_date.
+    """
+    # manufacturing payments
+    deposit = mfg.manufacturing_total * sched.mfg_deposit_pct
+    balance = mfg.manufacturing_total - deposit
+
+    events = [
+        (-sched.mfg_deposit_months_before_release, deposit, f"MFG deposit ({int(sched.mfg_deposit_pct*100)}%)"),
+        (-sched.mfg_balance_months_before_release, balance, "MFG balance"),
+        # fixed costs timing
+        (-sched.mastering_months_before_release, fixed.mastering, "Mastering"),
+        (-sched.artwork_months_before_release, fixed.artwork, "Artwork"),
+    ]
+    # marketing timing (profile)
+    for mo, frac in sched.marketing_profile.items():
+        events.append((mo, fixed.marketing * frac, f"Marketing ({int(round(frac*100))}%)"))
+    return events
+
+@traced()
 def build_cashflow_timeline(
     mfg: Manufacturing,
     fixed: ReleaseCosts,
@@ -179,49 +343,26 @@ def build_cashflow_timeline(
         raise ValueError("monthly_weights must match months_to_sell length")
 
     # Allocate unit sales by month (integers that sum exactly)
-    units_by_month = [int(round(units_sold_total * w)) for w in weights]
-    # fix rounding drift
-    drift = units_sold_total - sum(units_by_month)
-    i = 0
-    while drift != 0 and months > 0:
-        units_by_month[i % months] += 1 if drift > 0 else -1
-        drift = units_sold_total - sum(units_by_month)
-        i += 1
+    units_by_month = allocate_units_by_month(units_sold_total, weights).tolist()
 
     # Estimate orders by month
     orders_by_month = [math.ceil(u / max(1e-9, sales.avg_units_per_order)) if u > 0 else 0 for u in units_by_month]
 
-    # ---- Timeline range ----
-    # Start from earliest outflow month through last sales month
-    start_month_offset = min(
-        -sched.mfg_deposit_months_before_release,
-        -sched.mfg_balance_months_before_release,
-        -sched.mastering_months_before_release,
-        -sched.artwork_months_before_release,
-        min(sched.marketing_profile.keys()),
-    )
-    end_month_offset = max(0, months - 1)  # sales months start at offset 0
-
-    rows: List[Dict[str, object]] = []
-    cumulative = 0.0
-
     # Precompute cash events (by month offset)
     cash_out: Dict[int, float] = {}
+    details: Dict[int, List[str]] = {}
+    for mo, amount, label in release_cash_out_events(mfg, fixed, sched):
+        cash_out[mo] = cash_out.get(mo, 0.0) + amount
+        details.setdefault(mo, []).append(label)
 
-    # manufacturing payments
-    deposit = mfg.manufacturing_total * sched.mfg_deposit_pct
-    balance = mfg.manufacturing_total - deposit
-
-    cash_out[-sched.mfg_deposit_months_before_release] = cash_out.get(-sched.mfg_deposit_months_before_release, 0.0) + deposit
-    cash_out[-sched.mfg_balance_months_before_release] = cash_out.get(-sched.mfg_balance_months_before_release, 0.0) + balance
-
-    # fixed costs timing
-    cash_out[-sched.mastering_months_before_release] = cash_out.get(-sched.mastering_months_before_release, 0.0) + fixed.mastering
-    cash_out[-sched.artwork_months_before_release] = cash_out.get(-sched.artwork_months_before_release, 0.0) + fixed.artwork
+    # ---- Timeline range ----
+    # Start from earliest outflow month through the last sales month or
+    # outflow, whichever is later (e.g. marketing after a short sales run)
+    start_month_offset = min(cash_out)
+    end_month_offset = max(0, months - 1, max(cash_out))  # sales months start at offset 0
 
-    # marketing timing (profile)
-    for mo, frac in sched.marketing_profile.items():
-        cash_out[mo] = cash_out.get(mo, 0.0) + fixed.marketing * frac
+    rows: List[Dict[str, object]] = []
+    cumulative = 0.0
 
     # Build monthly rows
     for mo in range(start_month_offset, end_month_offset + 1):
@@ -248,22 +389,9 @@ def build_cashflow_timeline(
             "cash_out": out,
             "net": net,
             "cumulative": cumulative,
-            "detail": ""  # filled below
+            "detail": "; ".join(details.get(mo, [])),
         })
 
-    # Add simple labels to outflow months
-    def add_detail(offset: int, label: str):
-        r_index = offset - start_month_offset
-        if 0 <= r_index < len(rows):
-            rows[r_index]["detail"] = (rows[r_index]["detail"] + ("; " if rows[r_index]["detail"] else "") + label)
-
-    add_detail(-sched.mfg_deposit_months_before_release, f"MFG deposit ({int(sched.mfg_deposit_pct*100)}%)")
-    add_detail(-sched.mfg_balance_months_before_release, "MFG balance")
-    add_detail(-sched.mastering_months_before_release, "Mastering")
-    add_detail(-sched.artwork_months_before_release, "Artwork")
-    for mo, frac in sched.marketing_profile.items():
-        add_detail(mo, f"Marketing ({int(round(frac*100))}%)")
-
     # Find break-even month (first month cumulative >= 0)
     for r in rows:
         if r["cumulative"] >= 0:
@@ -272,6 +400,99 @@ def build_cashflow_timeline(
 
     return rows
 
+# ---------- Portfolio ----------
+
+@dataclass
+class PortfolioRelease:
+    name: str
+    mfg: Manufacturing
+    fixed: ReleaseCosts
+    sales: SalesPlan
+    sched: CashFlowSchedule  # sched.release_date places the release on the calendar
+
+def month_index(d: date) -> int:
+    return d.year * 12 + d.month - 1
+
+@traced()
+def build_portfolio_cashflow(
+    releases: Sequence[PortfolioRelease],
+    fees: ShopifyFees,
+) -> Dict[str, object]:
+    """
+    Aggregates many releases onto one shared monthly calendar.
+
+    Returns:
+      months            - "YYYY-MM" labels for the calendar
+      cash_in_after_processing, cash_out, net, cumulative
+                        - combined monthly arrays
+      release_net       - (len(releases), len(months)) net cash per release
+      trough, trough_month
+                        - lowest combined cumulative cash and when it happens
+      break_even_month  - first month at/after the trough with cumulative >= 0 (or None)
+    """
+    if not releases:
+        raise ValueError("portfolio needs at least one release")
+
+    rel_idx: List[np.ndarray] = []
+    cal_idx: List[np.ndarray] = []
+    cash_in_vals: List[np.ndarray] = []
+    cash_out_vals: List[np.ndarray] = []
+
+    for r, rel in enumerate(releases):
+        sales, sched = rel.sales, rel.sched
+        base = month_index(sched.release_date)
+
+        # sales months start at the release month
+        months = max(0, int(sales.months_to_sell))
+        weights = sales.monthly_weights or default_sales_weights(months)
+        if len(weights) != months:
+            raise ValueError(f"{rel.name}: monthly_weights must match months_to_sell length")
+        units_by_month = allocate_units_by_month(int(round(rel.mfg.units * sales.sell_through)), weights)
+        orders_by_month = np.where(units_by_month > 0, np.ceil(units_by_month / max(1e-9, sales.avg_units_per_order)), 0.0)
+        gross = units_by_month * sales.unit_price
+        cash_in = gross - (gross * fees.rate + orders_by_month * fees.fixed_per_order)
+
+        events = release_cash_out_events(rel.mfg, rel.fixed, sched)
+        offsets = np.array([mo for mo, _, _ in events], dtype=np.int64)
+        amounts = np.array([amount for _, amount, _ in events], dtype=float)
+
+        rel_idx.append(np.full(months + len(events), r, dtype=np.int64))
+        cal_idx.append(np.concatenate([base + np.arange(months, dtype=np.int64), base + offsets]))
+        cash_in_vals.append(np.concatenate([cash_in, np.zeros(len(events))]))
+        cash_out_vals.append(np.concatenate([np.zeros(months), amounts]))
+
+    rel_idx_all = np.concatenate(rel_idx)
+    cal_idx_all = np.concatenate(cal_idx)
+    first = int(cal_idx_all.min())
+    n_months = int(cal_idx_all.max()) - first + 1
+    flat = rel_idx_all * n_months + (cal_idx_all - first)
+    size = len(releases) * n_months
+
+    release_in = np.bincount(flat, weights=np.concatenate(cash_in_vals), minlength=size).reshape(len(releases), n_months)
+    release_out = np.bincount(flat, weights=np.concatenate(cash_out_vals), minlength=size).reshape(len(releases), n_months)
+    release_net = release_in - release_out
+
+    cash_in_total = release_in.sum(axis=0)
+    cash_out_total = release_out.sum(axis=0)
+    net = cash_in_total - cash_out_total
+    cumulative = np.cumsum(net)
+
+    labels = [f"{(first + i) // 12:04d}-{(first + i) % 12 + 1:02d}" for i in range(n_months)]
+    trough_i = int(np.argmin(cumulative))
+    recovered = np.flatnonzero(cumulative[trough_i:] >= 0)
+
+    return {
+        "months": labels,
+        "cash_in_after_processing": cash_in_total,
+        "cash_out": cash_out_total,
+        "net": net,
+        "cumulative": cumulative,
+        "release_net": release_net,
+        "trough": float(cumulative[trough_i]),
+        "trough_month": labels[trough_i],
+        "break_even_month": labels[trough_i + int(recovered[0])] if recovered.size else None,
+    }
+
 # ---------- CLI Prompts ----------
 
 def prompt_int(label: str, default: int) -> int:
@@ -283,6 +504,7 @@ def prompt_float(label: str, default: float) -> float:
     return float(raw) if raw else default
 
 
+@traced()
 def run_record_calculator():
     # Variables
     records = _prompt_int("Amount of Records", 2000)
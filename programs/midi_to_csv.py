@@ -1,6 +1,9 @@
 import csv
+import os
 import mido
+from programs.tracing import traced
 
+@traced()
 def convert_midi_to_csv(input_file):
     # Open the MIDI file
     mid = mido.MidiFile(input_file)
@@ -24,6 +27,7 @@ def convert_midi_to_csv(input_file):
                 if msg.type == 'note_on':
                     writer.writerow([track_index, msg.time, msg.type, msg.note, msg.velocity])
     print(f"Converted {input_file} to {output_file}")
+    return output_file
 
 if __name__ == "__main__":
     # Prompt the user for the path to the MIDI file
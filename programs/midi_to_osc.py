@@ -2,7 +2,9 @@ import os
 import mido
 from pythonosc import osc_bundle_builder
 from pythonosc import osc_message_builder
+from programs.tracing import traced
 
+@traced()
 def convert_midi_to_osc(input_file):
     # Open the MIDI file
     mid = mido.MidiFile(input_file)
@@ -32,6 +34,7 @@ def convert_midi_to_osc(input_file):
     with open(output_file, "wb") as f:
         f.write(bundle.build().dumps())
     print(f"Converted {input_file} to {output_file}")
+    return output_file
 
 if __name__ == "__main__":
     # Prompt the user for the MIDI file
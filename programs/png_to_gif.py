@@ -1,19 +1,31 @@
 import os
-import subprocess
+from programs.ffmpeg_exec import FFmpegError, run_ffmpeg, print_progress
+from programs.tracing import traced
 
-# Prompt user for directory path
-directory_path = input("Enter directory path: ")
 
-# Check if the specified directory exists
-if not os.path.exists(directory_path):
-    print(f"Error: Directory '{directory_path}' does not exist.")
-    exit()
+@traced()
+def png_to_gif(directory_path, threads=None, progress=True):
+    # Check if the specified directory exists
+    if not os.path.exists(directory_path):
+        raise FileNotFoundError(f"Directory '{directory_path}' does not exist.")
 
-# Call ffmpeg to generate GIF
-command = f'ffmpeg -i {directory_path}/%05d.png -filter_complex "[0:v]crop=min(iw\,ih):min(iw\,ih),scale=128:128,split [a][b];[a] palettegen=reserve_transparent=on:transparency_color=0x00000000 [p];[b][p] paletteuse" -r 10 -y {directory_path}/output.gif'
-try:
-    subprocess.check_output(command, stderr=subprocess.STDOUT, shell=True)
-    print(f"GIF saved to '{directory_path}/output.gif'.")
-except subprocess.CalledProcessError as e:
-    print(f"Error: {e.output.decode('utf-8')}")
+    # Call ffmpeg to generate GIF
+    filter_graph = r"[0:v]crop=min(iw\,ih):min(iw\,ih),scale=128:128,split [a][b];[a] palettegen=reserve_transparent=on:transparency_color=0x00000000 [p];[b][p] paletteuse"
+    output_file = os.path.join(directory_path, 'output.gif')
+    run_ffmpeg(['-i', os.path.join(directory_path, '%05d.png'), '-filter_complex', filter_graph,
+                '-r', '10', '-y', output_file], threads=threads, on_progress=print_progress if progress else None)
+    print(f"GIF saved to '{output_file}'.")
+    return output_file
 
+
+def main():
+    # Prompt user for directory path
+    directory_path = input("Enter directory path: ")
+    try:
+        png_to_gif(directory_path)
+    except (FileNotFoundError, FFmpegError) as e:
+        print(f"Error: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,10 @@
 import os
 import argparse
 from pydub import AudioSegment
+from programs.ffmpeg_exec import encode_slots
+from programs.tracing import span, traced
 
+@traced()
 def change_pitch(input_directory, percentage):
     # Create new directory called "pitched" in the same location as input_directory
     output_directory = os.path.join(input_directory, "pitched")
@@ -12,12 +15,14 @@ def change_pitch(input_directory, percentage):
         if filename.endswith(".mp3") or filename.endswith(".wav"):
             input_filepath = os.path.join(input_directory, filename)
             # Open audio file using pydub
-            audio = AudioSegment.from_file(input_filepath)
+            with encode_slots(), span("decode", file=filename):
+                audio = AudioSegment.from_file(input_filepath)
             # Change pitch by specified percentage
             audio_pitch_shifted = audio.effects.pitch_shift(n_semitones=percentage)
             # Save the modified file
             output_filepath = os.path.join(output_directory, filename)
-            audio_pitch_shifted.export(output_filepath, format="mp3")
+            with encode_slots(), span("encode", file=filename):
+                audio_pitch_shifted.export(output_filepath, format="mp3")
 
 if __name__ == "__main__":
     input_directory = input("Enter the directory containing the audio files: ")
@@ -0,0 +1,408 @@
+"""
+Tempo, beat and onset detection for the beat tools.
+
+Audio is decoded in fixed-size blocks (WAVs directly, anything else through
+ffmpeg) and reduced to a spectral-flux onset envelope as it streams, so
+memory stays bounded by the block size plus ~86 envelope values per second.
+Results (without onsets) are cached in a JSON file keyed by a hash of the
+file contents.
+"""
+import contextlib
+import hashlib
+import json
+import os
+import random
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from programs.ffmpeg_exec import encode_slots, stream_ffmpeg, use_encode_slots
+from programs import tracing
+from programs.tracing import traced
+
+# bump when the analysis changes so stale cache entries are ignored
+ANALYSIS_VERSION = 3
+
+ANALYSIS_RATE = 22050          # ffmpeg resamples non-WAV input to this
+HOP_SECONDS = 256 / 22050      # onset envelope resolution (~11.6 ms)
+BLOCK_SAMPLES = 1 << 16        # samples decoded per block
+MIN_BPM = 60
+MAX_BPM = 200
+BEATS_PER_BAR = 4
+# autocorrelation at the beat period as a fraction of lag 0; below this the
+# "beat" is noise (white noise and beatless audio sit around 0.05-0.08)
+MIN_BEAT_STRENGTH = 0.09
+
+AUDIO_EXTENSIONS = (".wav", ".mp3", ".flac", ".ogg", ".aiff", ".m4a", ".mp4")
+
+# what the cache keeps per file; onset lists grow with duration, so they're left out
+CACHED_FIELDS = ("bpm", "beat_offset", "downbeat_offset", "duration")
+
+DEFAULT_CACHE = os.environ.get("MEOW_TEMPO_CACHE", os.path.join(os.path.expanduser("~"), ".meow", "tempo_cache.json"))
+
+
+# ---------- Decoding ----------
+
+def _wav_blocks(path):
+    with wave.open(path, "rb") as f:
+        width, channels, rate = f.getsampwidth(), f.getnchannels(), f.getframerate()
+        if width not in (1, 2, 4):
+            raise wave.Error(f"unsupported sample width {width}")
+        dtype = {1: np.uint8, 2: "<i2", 4: "<i4"}[width]
+        scale = float(1 << (8 * width - 1))
+        yield rate
+        while True:
+            raw = f.readframes(BLOCK_SAMPLES)
+            if not raw:
+                break
+            samples = np.frombuffer(raw, dtype=dtype).astype(np.float32)
+            if width == 1:
+                samples -= 128.0  # 8-bit WAV is unsigned
+            yield samples.reshape(-1, channels).mean(axis=1) / scale
+
+
+def _ffmpeg_blocks(path):
+    yield ANALYSIS_RATE
+    leftover = b""
+    for chunk in stream_ffmpeg(["-i", path, "-vn", "-ac", "1", "-ar", str(ANALYSIS_RATE), "-f", "s16le", "pipe:1"],
+                               block_size=BLOCK_SAMPLES * 2):
+        chunk = leftover + chunk
+        usable = len(chunk) - len(chunk) % 2
+        leftover = chunk[usable:]
+        yield np.frombuffer(chunk[:usable], dtype="<i2").astype(np.float32) / 32768.0
+
+
+def audio_blocks(path):
+    """Yields the sample rate, then mono float32 blocks of the file."""
+    if path.lower().endswith(".wav"):
+        try:
+            blocks = _wav_blocks(path)
+            rate = next(blocks)
+            return rate, blocks
+        except (wave.Error, EOFError):
+            pass  # float/24-bit/odd WAVs go through ffmpeg
+    blocks = _ffmpeg_blocks(path)
+    return next(blocks), blocks
+
+
+# ---------- Onset envelope ----------
+
+class OnsetEnvelope:
+    """
+    Streaming spectral flux: feed() audio blocks in order, then read
+    envelope (one value per hop) and frame_rate.
+    """
+
+    def __init__(self, sample_rate):
+        self.hop = max(1, int(round(sample_rate * HOP_SECONDS)))
+        self.window_size = self.hop * 4
+        self.window = np.hanning(self.window_size).astype(np.float32)
+        self.frame_rate = sample_rate / self.hop
+        self.samples = 0
+        self._tail = np.zeros(0, dtype=np.float32)
+        self._prev = None
+        self._flux = []
+
+    def feed(self, block):
+        self.samples += len(block)
+        buf = np.concatenate([self._tail, block])
+        if len(buf) < self.window_size:
+            self._tail = buf
+            return
+        n_frames = 1 + (len(buf) - self.window_size) // self.hop
+        frames = np.lib.stride_tricks.sliding_window_view(buf, self.window_size)[::self.hop][:n_frames]
+        spectrum = np.log1p(100.0 * np.abs(np.fft.rfft(frames * self.window, axis=1)))
+
+        previous = spectrum[:1] if self._prev is None else self._prev[None, :]
+        flux = np.maximum(np.diff(np.concatenate([previous, spectrum]), axis=0), 0.0).sum(axis=1)
+        self._flux.append(flux)
+        self._prev = spectrum[-1]
+        self._tail = buf[n_frames * self.hop:]
+
+    def frame_time(self, frames):
+        # a hit registers once it reaches the middle of the analysis window
+        return (np.asarray(frames) * self.hop + self.window_size / 2) / (self.frame_rate * self.hop)
+
+    @property
+    def envelope(self):
+        if not self._flux:
+            return np.zeros(0)
+        return np.concatenate(self._flux)
+
+
+# ---------- Tempo / beats ----------
+
+def _local_mean(x, width):
+    width = max(1, int(width))
+    return np.convolve(x, np.ones(width) / width, mode="same")
+
+
+def estimate_tempo(envelope, frame_rate):
+    """
+    Autocorrelation tempo estimate with a log-normal prior around 120 BPM.
+    Returns (bpm, beat period in envelope frames) or (None, None) if the
+    audio is silent, has no clear beat, or is too short to hold two beats
+    at MIN_BPM.
+    """
+    min_period = frame_rate * 60 / MAX_BPM
+    max_period = frame_rate * 60 / MIN_BPM
+    min_lag = int(np.floor(min_period))
+    max_lag = int(np.ceil(max_period))
+    if len(envelope) < 2 * max_lag:
+        return None, None
+
+    # a little smoothing keeps sharp clicks from falling between lag bins
+    onset = np.convolve(envelope - envelope.mean(), np.hanning(5) / 2.0, mode="same")
+    spectrum = np.fft.rfft(onset, 2 * len(onset))
+    ac = np.fft.irfft(spectrum * np.conj(spectrum))[:len(onset)]
+    if ac[0] <= 1e-9:
+        return None, None  # silence (or a perfectly flat envelope)
+
+    lags = np.arange(min_lag, max_lag + 1)
+    prior = np.exp(-0.5 * np.log2((60 * frame_rate / lags) / 120.0) ** 2)
+    # score each lag by its best neighbour so a period between two frames isn't penalised
+    peak = np.maximum(ac[lags], np.maximum(ac[lags - 1], ac[lags + 1]))
+    best = int(np.argmax(peak * prior))
+    if peak[best] / ac[0] < MIN_BEAT_STRENGTH:
+        return None, None
+    period = float(lags[best])
+
+    # refine on the peak a few beats out, where one frame of error is a
+    # fraction of a beat; keeps long files from drifting off the grid
+    for beats in (2, 4, 8, 16):
+        center = int(round(period * beats))
+        if center + 3 >= len(ac) // 2:
+            break
+        lag = center - 2 + int(np.argmax(ac[center - 2:center + 3]))
+        a, b, c = ac[lag - 1], ac[lag], ac[lag + 1]
+        shift = 0.5 * (a - c) / (a - 2 * b + c) if (a - 2 * b + c) != 0 else 0.0
+        period = (lag + float(np.clip(shift, -0.5, 0.5))) / beats
+    # refinement can land just outside the search range at the edges
+    period = float(np.clip(period, min_period, max_period))
+    return 60 * frame_rate / period, period
+
+
+def _comb_phase(envelope, period, candidates):
+    # mean onset strength along a grid of `period` starting at each candidate;
+    # a mean, not a sum, so earlier candidates don't win by fitting one more hit
+    steps = np.arange(int(len(envelope) / period) + 1) * period
+    positions = np.rint(np.asarray(candidates, dtype=float)[:, None] + steps[None, :]).astype(np.int64)
+    valid = positions < len(envelope)
+    hits = np.where(valid, envelope[np.minimum(positions, len(envelope) - 1)], 0.0).sum(axis=1)
+    return hits / np.maximum(valid.sum(axis=1), 1)
+
+
+def beat_phase(envelope, period):
+    """
+    Returns (beat offset, downbeat offset) in envelope frames: the first
+    beat, and which of the first BEATS_PER_BAR beats starts the bars.
+    """
+    phases = np.arange(int(np.ceil(period)))
+    beat = float(phases[np.argmax(_comb_phase(envelope, period, phases))])
+    bar_starts = beat + np.arange(BEATS_PER_BAR) * period
+    downbeat = float(bar_starts[np.argmax(_comb_phase(envelope, period * BEATS_PER_BAR, bar_starts))])
+    return beat, downbeat
+
+
+def pick_onsets(envelope, frame_rate):
+    """Frames where the envelope peaks clearly above its local average."""
+    if len(envelope) < 3:
+        return np.zeros(0, dtype=np.int64)
+    threshold = _local_mean(envelope, frame_rate * 0.1) + 0.5 * envelope.std()
+    peaks = (envelope[1:-1] > envelope[:-2]) & (envelope[1:-1] >= envelope[2:]) & (envelope[1:-1] > threshold[1:-1])
+    return np.flatnonzero(peaks) + 1
+
+
+@traced()
+def analyze_file(path):
+    """
+    Returns {bpm, beat_offset, downbeat_offset, duration, onsets} with
+    offsets, duration and onset times in seconds. bpm and offsets are None
+    when the file is silent, beatless or too short to estimate a tempo.
+    """
+    rate, blocks = audio_blocks(path)
+    onset_env = OnsetEnvelope(rate)
+    for block in blocks:
+        onset_env.feed(block)
+
+    envelope = onset_env.envelope
+    frame_rate = onset_env.frame_rate
+    bpm, period = estimate_tempo(envelope, frame_rate)
+    beat = downbeat = None
+    if bpm is not None:
+        # smoothed so the comb doesn't miss peaks by a frame
+        beat, downbeat = beat_phase(np.convolve(envelope, np.hanning(5) / 2.0, mode="same"), period)
+
+    return {
+        "bpm": round(bpm, 2) if bpm is not None else None,
+        "beat_offset": round(float(onset_env.frame_time(beat)), 4) if beat is not None else None,
+        "downbeat_offset": round(float(onset_env.frame_time(downbeat)), 4) if downbeat is not None else None,
+        "duration": round(onset_env.samples / rate, 4),
+        "onsets": np.round(onset_env.frame_time(pick_onsets(envelope, frame_rate)), 4).tolist(),
+    }
+
+
+def random_bar_start(duration, bar_length, downbeat_offset):
+    """
+    A random bar start on the detected grid that still leaves a full bar
+    before duration (any unit, as long as all three match).
+    """
+    bars = int((duration - downbeat_offset - bar_length) // bar_length)
+    if bars < 0:
+        return 0
+    return downbeat_offset + random.randint(0, bars) * bar_length
+
+
+# ---------- Cache ----------
+
+def file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_key(digest):
+    return f"{digest}:v{ANALYSIS_VERSION}"
+
+
+def load_cache(cache_path=None):
+    cache_path = cache_path or DEFAULT_CACHE
+    try:
+        with open(cache_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _summary(result):
+    return {field: result[field] for field in CACHED_FIELDS}
+
+
+@contextlib.contextmanager
+def _cache_lock(cache_path, stale_after=30.0):
+    # O_EXCL lock file rather than fcntl so it works on Windows too; a lock
+    # older than stale_after belonged to a writer that died and is broken
+    lock_path = cache_path + ".lock"
+    while True:
+        try:
+            fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(lock_path) > stale_after:
+                    os.remove(lock_path)
+                    continue
+            except OSError:
+                continue  # released between the two calls
+            time.sleep(0.02)
+    try:
+        yield
+    finally:
+        os.close(fd)
+        os.remove(lock_path)
+
+
+def save_cache(entries, cache_path=None):
+    """
+    Merges entries into the cache file. The read-merge-write runs under a
+    lock file, so concurrent tools (e.g. batch workers) don't drop each
+    other's results; entries from older ANALYSIS_VERSIONs are dropped on
+    the way.
+    """
+    cache_path = cache_path or DEFAULT_CACHE
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    suffix = _cache_key("")
+    with _cache_lock(cache_path):
+        cache = {key: entry for key, entry in load_cache(cache_path).items() if key.endswith(suffix)}
+        cache.update(entries)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, cache_path)
+
+
+def detect_tempo(path, cache_path=None):
+    """
+    Cached analyze_file for a single file, without onsets. To analyze
+    many files, call analyze_library once instead: this reads and
+    rewrites the whole cache on every miss.
+    """
+    key = _cache_key(file_hash(path))
+    cached = load_cache(cache_path).get(key)
+    if cached is not None:
+        return cached
+    result = _summary(analyze_file(path))
+    save_cache({key: result}, cache_path)
+    return result
+
+
+def _find_audio(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                files.extend(os.path.join(root, n) for n in sorted(names) if n.lower().endswith(AUDIO_EXTENSIONS))
+        else:
+            files.append(path)
+    return files
+
+
+def _hash_or_error(path):
+    try:
+        return file_hash(path)
+    except OSError as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def _analyze_or_error(path):
+    try:
+        return _summary(analyze_file(path))
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    finally:
+        # pool workers never run atexit hooks, so flush after every file
+        tracing.write()
+
+
+@traced()
+def analyze_library(paths, workers=None, cache_path=None):
+    """
+    Analyzes every audio file under paths (files or directories) on a
+    process pool, skipping files whose contents are already cached.
+    Returns {file path: analysis without onsets}; failed files get
+    {"error": ...} and are not cached.
+    """
+    files = _find_audio(paths)
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=use_encode_slots, initargs=(encode_slots(),)) as pool:
+        chunksize = max(1, len(files) // (4 * (workers or os.cpu_count() or 1)))
+        keys = {}
+        for path, digest in zip(files, pool.map(_hash_or_error, files, chunksize=chunksize)):
+            if isinstance(digest, dict):
+                results[path] = digest  # missing/unreadable; keep scanning the rest
+            else:
+                keys[path] = _cache_key(digest)
+        cache = load_cache(cache_path)
+        misses = []
+        for path in keys:
+            if keys[path] in cache:
+                results[path] = cache[keys[path]]
+            else:
+                misses.append(path)
+
+        fresh = {}
+        for path, result in zip(misses, pool.map(_analyze_or_error, misses, chunksize=chunksize)):
+            results[path] = result
+            if "error" not in result:
+                fresh[keys[path]] = result
+            # checkpoint so an interrupted scan keeps what it finished
+            if len(fresh) >= 100:
+                save_cache(fresh, cache_path)
+                fresh = {}
+        if fresh:
+            save_cache(fresh, cache_path)
+    return {path: results[path] for path in files}
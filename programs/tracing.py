@@ -0,0 +1,196 @@
+"""
+Opt-in tracing for MEOW tools.
+
+Set MEOW_TRACE=path/to/trace.json (or pass --trace to meow_app) to record
+nested timing spans with CPU time, child-process CPU time (ffmpeg), peak
+RSS and bytes read/written. MEOW_TRACE_FORMAT picks the output:
+
+  chrome (default) - Chrome trace events, open in chrome://tracing or Perfetto
+  json             - flat list of spans with parent ids
+
+When tracing is off, span() hands back a shared no-op context manager and
+@traced calls straight through.
+"""
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_enabled = False
+_path = None
+_format = "chrome"
+_owner_pid = None
+_spans = []
+_local = threading.local()
+_ids = iter(range(1, sys.maxsize))
+
+
+def enabled():
+    return _enabled
+
+
+def enable(path, fmt=None):
+    global _enabled, _path, _format, _owner_pid
+    if not _enabled:
+        atexit.register(write)
+    _enabled = True
+    _path = path
+    _format = fmt or os.environ.get("MEOW_TRACE_FORMAT", "chrome")
+    # spawned workers re-import this module and enable() again from MEOW_TRACE;
+    # the exported owner pid keeps them writing per-pid files instead of _path
+    _owner_pid = int(os.environ.setdefault("MEOW_TRACE_OWNER", str(os.getpid())))
+
+
+def _children_cpu():
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    scale = 1024 if sys.platform == "darwin" else 1  # macOS reports bytes
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale
+    return max(own, children)
+
+
+def _io_bytes():
+    # Linux only; counts this process's reads/writes (not ffmpeg's)
+    try:
+        with open("/proc/self/io") as f:
+            fields = dict(line.split(": ") for line in f.read().splitlines())
+        return int(fields["rchar"]), int(fields["wchar"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    def __init__(self, name, attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        stack = getattr(_local, "stack", None)
+        if stack is None:
+            stack = _local.stack = []
+        self.id = next(_ids)
+        self.parent = stack[-1].id if stack else None
+        stack.append(self)
+        self.io = _io_bytes()
+        self.children_cpu = _children_cpu()
+        self.cpu = time.process_time()
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end_ns = time.perf_counter_ns()
+        cpu = time.process_time() - self.cpu
+        children_cpu = _children_cpu()
+        io = _io_bytes()
+        _local.stack.pop()
+
+        record = {
+            "id": self.id,
+            "parent": self.parent,
+            "name": self.name,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "start_us": self.start_ns / 1000,
+            "duration_us": (end_ns - self.start_ns) / 1000,
+            "cpu_s": cpu,
+            "children_cpu_s": children_cpu - self.children_cpu if children_cpu is not None else None,
+            "peak_rss_kb": _peak_rss_kb(),
+            "bytes_read": io[0] - self.io[0] if io and self.io else None,
+            "bytes_written": io[1] - self.io[1] if io and self.io else None,
+            "attrs": self.attrs,
+        }
+        if exc_type is not None:
+            record["error"] = f"{exc_type.__name__}: {exc}"
+        _spans.append(record)
+        return False
+
+
+def span(name, **attrs):
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name, attrs)
+
+
+def traced(name=None):
+    """Decorator form of span(); the span name defaults to module.function."""
+    def decorate(func):
+        span_name = name or f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def _chrome_events(spans):
+    events = []
+    for s in spans:
+        args = {k: v for k, v in s.items()
+                if k not in ("id", "parent", "name", "pid", "tid", "start_us", "duration_us", "attrs") and v is not None}
+        args.update(s["attrs"])
+        events.append({
+            "name": s["name"], "ph": "X", "pid": s["pid"], "tid": s["tid"],
+            "ts": s["start_us"], "dur": s["duration_us"], "args": args,
+        })
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write():
+    """
+    Writes the spans recorded in this process. Worker processes (e.g. the
+    batch pool) write next to the main file as <name>.<pid><ext>.
+    """
+    if not _enabled:
+        return None
+    pid = os.getpid()
+    path = _path
+    if pid != _owner_pid:
+        root, ext = os.path.splitext(_path)
+        path = f"{root}.{pid}{ext}"
+    # forked workers inherit the parent's spans; keep only our own
+    spans = [s for s in _spans if s["pid"] == pid]
+    payload = _chrome_events(spans) if _format == "chrome" else {"spans": spans}
+    with open(path, "w") as f:
+        json.dump(payload, f, default=str)
+    return path
+
+
+if os.environ.get("MEOW_TRACE"):
+    enable(os.environ["MEOW_TRACE"])